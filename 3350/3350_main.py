@@ -13,6 +13,15 @@ import pytz
 import requests  # NEW
 from bs4 import BeautifulSoup  # NEW
 import re
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(str(Path(__file__).parent.parent / "multibot"))  # Helpers shared with the multibot runner
+from loop_watchdog import LoopWatchdog
+from snapshot import save_status, load_status
+from ticks import TickStore
+from charts import ChartCache, parse_window, render_chart
 
 # Load .env file
 env_path = Path(__file__).parent / ".env.3350"
@@ -26,8 +35,33 @@ intents.members = True          # Needed to access member join info
 
 bot = discord.Bot(intents=intents)
 
+# Last status and exchange rate, saved so a restart has something to show right away
+snapshot_path = Path(__file__).parent / "snapshot_3350.json"
+snapshot = load_status(snapshot_path, 72 * 3600)
+
 last_status = None  # Track last status to avoid redundant updates
-latest_usd_to_jpy = None  # Cache the latest exchange rate
+restored_status = snapshot.get("status")
+latest_usd_to_jpy = snapshot.get("usd_to_jpy")  # Cache the latest exchange rate
+rate_restored_at = snapshot.get("saved") if latest_usd_to_jpy else None  # Set while the rate still comes from the snapshot
+
+def save_snapshot():
+    rate = float(latest_usd_to_jpy) if latest_usd_to_jpy else None
+    save_status(snapshot_path, last_status, usd_to_jpy=rate)
+
+watchdog = LoopWatchdog(Path(__file__).parent / "watchdog.log", 0.25)  # 250 ms
+
+# Intraday prices for /chart. Every single-ticker bot records its own ticks in
+# a ticks folder next to it; this bot draws charts for all of them.
+TICK_RETENTION_SECONDS = 24 * 3600
+CHART_FOLDERS = {
+    "3350": Path(__file__).parent / "ticks",
+    "MTPLF": Path(__file__).parent.parent / "mpbot" / "ticks",
+    "DN3": Path(__file__).parent.parent / "dn3bot" / "ticks",
+    "BTC": Path(__file__).parent.parent / "btcbot" / "ticks",
+}
+tick_store = TickStore(CHART_FOLDERS["3350"], TICK_RETENTION_SECONDS)
+chart_cache = ChartCache(16)
+chart_pool = None  # Render process, started under __main__ below
 
 # Tokyo timezone
 TOKYO_TZ = pytz.timezone("Asia/Tokyo")
@@ -52,7 +86,7 @@ def get_tse_market_times():
     return upcoming
 
 def get_3350_price_and_change():
-    global latest_usd_to_jpy
+    global latest_usd_to_jpy, rate_restored_at
     ticker = yf.Ticker("3350.T")
     data = ticker.history(period="2d")
 
@@ -60,12 +94,14 @@ def get_3350_price_and_change():
         prev_close = data['Close'].iloc[-2]
         last = data['Close'].iloc[-1]
         change = ((last - prev_close) / prev_close) * 100
+        tick_store.append("3350", time.time(), float(last))
 
         # Get USD/JPY exchange rate
         fx = yf.Ticker("JPY=X")
         fx_data = fx.history(period="1d")
         if not fx_data.empty:
             latest_usd_to_jpy = fx_data['Close'].iloc[-1]
+            rate_restored_at = None
             usd_price = last / latest_usd_to_jpy
         else:
             usd_price = None
@@ -112,8 +148,24 @@ def get_pts_price_3350():
 
 @bot.event
 async def on_ready():
+    global last_status
     print(f"3350 Bot Logged in as {bot.user}")
-    update_status.start()
+    if watchdog.loop_thread_id is None:  # on_ready fires again after reconnects
+        watchdog.start(asyncio.get_running_loop())
+
+    if update_status.is_running():
+        last_status = None  # Reconnected: let the running loop re-send the status
+    else:
+        # Show the pre-restart status until the first fetch replaces it
+        if restored_status:
+            stale_status = f"{restored_status} (stale)"
+            await bot.change_presence(activity=discord.CustomActivity(name=stale_status))
+            last_status = stale_status
+            print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Status restored from snapshot: '{stale_status}'")
+        update_status.start()
+
+    if not snapshot_status.is_running():
+        snapshot_status.start()
 
 @tasks.loop(seconds=15)
 async def update_status():
@@ -137,17 +189,87 @@ async def update_status():
     except Exception as e:
         print(f"Error during update cycle: {e}")
 
+# Save status and exchange rate at intervals for a warm restart, and write out new ticks
+@tasks.loop(seconds=60)
+async def snapshot_status():
+    try:
+        await asyncio.to_thread(save_snapshot)
+    except Exception as e:
+        print(f"Error saving snapshot: {e}")
+    try:
+        await asyncio.to_thread(tick_store.write, tick_store.take_pending())
+    except Exception as e:
+        print(f"Error writing ticks: {e}")
+
 @bot.slash_command(name="cy", description="Convert yen to USD")
 async def convert_yen(ctx: discord.ApplicationContext, yen: float):
     print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] /cy command called with ¥{yen:,.0f}")
     if latest_usd_to_jpy:
         usd_amount = yen / latest_usd_to_jpy
         print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Conversion result: ¥{yen:,.0f} = ${usd_amount:,.2f}")
-        await ctx.respond(f"¥{yen:,.0f} is approximately ${usd_amount:,.2f} USD.")
+        if rate_restored_at:
+            rate_time = time.strftime('%Y-%m-%d %H:%M', time.localtime(rate_restored_at))
+            await ctx.respond(f"¥{yen:,.0f} is approximately ${usd_amount:,.2f} USD (rate from {rate_time}, refreshing).")
+        else:
+            await ctx.respond(f"¥{yen:,.0f} is approximately ${usd_amount:,.2f} USD.")
     else:
         print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] No cached exchange rate available.")
         await ctx.respond("Exchange rate not yet available. Please try again shortly.")
 
+def is_mod_or_admin(member):
+    roles = [role.name.lower() for role in getattr(member, "roles", [])]
+    return 'moderator' in roles or 'admin' in roles
+
+@bot.slash_command(name="lag", description="Event loop lag and recent stalls (mods only)")
+async def lag(ctx: discord.ApplicationContext):
+    if not is_mod_or_admin(ctx.author):
+        await ctx.respond("You don't have permission to use this command.", ephemeral=True)
+        return
+    await ctx.respond(watchdog.summary(), ephemeral=True)
+
+def read_ticks(symbol, seconds):
+    """Blocking file I/O: what another bot has written to its ticks folder (up to a minute behind)."""
+    store = TickStore(CHART_FOLDERS[symbol], TICK_RETENTION_SECONDS)
+    store.ticks[symbol] = deque(store.read(symbol))
+    return store.window(symbol, seconds)
+
+async def get_chart(symbol, window, seconds, style):
+    """PNG bytes for a chart, or None if there isn't enough history yet."""
+    bucket = int(time.time() // 60)  # Identical requests within a minute reuse one image
+
+    async def render():
+        if symbol == "3350":
+            times, prices = tick_store.window(symbol, seconds)
+        else:
+            times, prices = await asyncio.to_thread(read_ticks, symbol, seconds)
+        if len(prices) < 2:
+            return None
+        end = time.time()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(chart_pool, render_chart, f"{symbol} {window}", times, prices, end - seconds, end, style)
+
+    return await chart_cache.get((symbol, seconds, style, bucket), render)
+
+@bot.slash_command(name="chart", description="Intraday chart (3350, MTPLF, DN3 or BTC)")
+async def chart(
+    ctx: discord.ApplicationContext,
+    symbol: discord.Option(str, choices=list(CHART_FOLDERS), default="3350") = "3350",
+    window: str = "1d",
+    style: discord.Option(str, choices=["line", "candle"], default="line") = "line",
+):
+    seconds = parse_window(window)
+    if not seconds or seconds > TICK_RETENTION_SECONDS:
+        await ctx.respond(f"Window should look like 30m, 4h or 1d (up to {TICK_RETENTION_SECONDS // 3600}h).")
+        return
+
+    await ctx.defer()
+    print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] /chart {symbol} {window} {style} called")
+    png = await get_chart(symbol, window.strip().lower(), seconds, style)
+    if png is None:
+        await ctx.respond(f"Not enough price history for {symbol} yet.")
+        return
+    await ctx.respond(file=discord.File(io.BytesIO(png), filename=f"{symbol}-{window.strip()}.png"))
+
 @bot.slash_command(name="pts", description="Get the latest PTS price for 3350 (Metaplanet) from SBI")
 async def pts(ctx: discord.ApplicationContext):
     await ctx.defer()
@@ -166,4 +288,20 @@ async def pts(ctx: discord.ApplicationContext):
     await ctx.respond(message)
 
 
-bot.run(TOKEN)
+# Guarded because the chart render process re-imports this file on Windows
+if __name__ == "__main__":
+    tick_store.load(["3350"])
+    chart_pool = ProcessPoolExecutor(max_workers=1)
+
+    bot.run(TOKEN)
+
+    # bot.run returns once the bot is shut down (e.g. Ctrl+C)
+    chart_pool.shutdown(wait=False, cancel_futures=True)
+    try:
+        tick_store.write(tick_store.take_pending())
+    except Exception as e:
+        print(f"Error writing ticks: {e}")
+    try:
+        save_snapshot()
+    except Exception as e:
+        print(f"Error saving snapshot: {e}")
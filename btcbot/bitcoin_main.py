@@ -7,6 +7,12 @@ from dotenv import load_dotenv
 import time
 from datetime import datetime
 from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent / "multibot"))  # Helpers shared with the multibot runner
+from loop_watchdog import LoopWatchdog
+from snapshot import save_status, load_status
+from ticks import TickStore
 
 # Load environment variables
 env_path = Path(__file__).parent / ".env.btc"
@@ -16,6 +22,22 @@ TOKEN = os.environ['DISCORD_BOT_TOKEN']
 intents = discord.Intents.default()
 client = discord.Client(intents=intents)
 
+watchdog = LoopWatchdog(Path(__file__).parent / "watchdog.log", 0.25)  # 250 ms
+
+# Intraday prices, drawn by the 3350 bot's /chart
+tick_store = TickStore(Path(__file__).parent / "ticks", 24 * 3600)
+tick_store.load(["BTC"])
+
+# Last status, saved so a restart has something to show right away
+snapshot_path = Path(__file__).parent / "snapshot_btc.json"
+SNAPSHOT_SECONDS = 60
+last_status = None  # Track last status to avoid redundant updates
+update_loop_running = False
+restored_status = load_status(snapshot_path, 72 * 3600).get("status")
+
+def save_snapshot():
+    save_status(snapshot_path, last_status)
+
 # === Price Functions ===
 
 def get_btc_usd_price_and_change():
@@ -28,6 +50,7 @@ def get_btc_usd_price_and_change():
         latest = data['Close'].iloc[-1]
         previous = data['Close'].iloc[-2]
         change = ((latest - previous) / previous) * 100
+        tick_store.append("BTC", time.time(), float(latest))
         print(f"[{datetime.now()}] ðŸ’µ USD fetched: ${latest:.2f}, Previous: ${previous:.2f}, Change: {change:+.2f}%")
         return latest, change
     else:
@@ -49,8 +72,22 @@ async def get_btc_price_jpy():
 @client.event
 async def on_ready():
     print(f"[{datetime.now()}] âœ… Bitcoin Bot Logged in as {client.user}")
-    last_status = None
+    global last_status, update_loop_running
     cycle_count = 0
+    if watchdog.loop_thread_id is None:  # on_ready fires again after reconnects
+        watchdog.start(asyncio.get_running_loop())
+
+    # on_ready fires again after reconnects; keep a single update loop
+    if update_loop_running:
+        last_status = None  # Let the running loop re-send the status
+        return
+    update_loop_running = True
+
+    # Show the pre-restart status until the first fetch replaces it
+    if restored_status:
+        last_status = f"{restored_status} (stale)"
+        await client.change_presence(activity=discord.CustomActivity(name=last_status))
+    last_snapshot = time.time()
 
     while True:
         try:
@@ -86,6 +123,12 @@ async def on_ready():
             else:
                 print(f"[{datetime.now()}] âš ï¸ Status unchanged, skipping update.")
 
+            # Save the status at intervals for a warm restart, and write out new ticks
+            if time.time() - last_snapshot >= SNAPSHOT_SECONDS:
+                last_snapshot = time.time()
+                await asyncio.to_thread(save_snapshot)
+                await asyncio.to_thread(tick_store.write, tick_store.take_pending())
+
             await asyncio.sleep(15)
 
         except Exception as e:
@@ -93,3 +136,13 @@ async def on_ready():
             await asyncio.sleep(15)
 
 client.run(TOKEN)
+
+# client.run returns once the bot is shut down (e.g. Ctrl+C)
+try:
+    tick_store.write(tick_store.take_pending())
+except Exception as e:
+    print(f"Error writing ticks: {e}")
+try:
+    save_snapshot()
+except Exception as e:
+    print(f"Error saving snapshot: {e}")
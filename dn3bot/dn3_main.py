@@ -9,6 +9,12 @@ import datetime
 import pytz
 import re
 import yfinance as yf
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent / "multibot"))  # Helpers shared with the multibot runner
+from loop_watchdog import LoopWatchdog
+from snapshot import save_status, load_status
+from ticks import TickStore
 
 # Load environment variables
 env_path = Path(__file__).parent / ".env.dn3"
@@ -22,6 +28,22 @@ client = discord.Client(intents=intents)
 
 update_count = 0
 
+watchdog = LoopWatchdog(Path(__file__).parent / "watchdog.log", 0.25)  # 250 ms
+
+# Intraday prices, drawn by the 3350 bot's /chart
+tick_store = TickStore(Path(__file__).parent / "ticks", 24 * 3600)
+tick_store.load(["DN3"])
+
+# Last status, saved so a restart has something to show right away
+snapshot_path = Path(__file__).parent / "snapshot_dn3.json"
+SNAPSHOT_SECONDS = 60
+last_status = None  # Track last status to avoid redundant updates
+update_loop_running = False
+restored_status = load_status(snapshot_path, 72 * 3600).get("status")
+
+def save_snapshot():
+    save_status(snapshot_path, last_status)
+
 # Frankfurt market timezone
 FRANKFURT_TZ = pytz.timezone("Europe/Berlin")
 
@@ -47,6 +69,8 @@ async def get_dn3_price_and_change_tradegate():
 
         price = float(last_raw)
         change = float(delta_raw)
+        if price:
+            tick_store.append("DN3", time.time(), price)
 
         # Get EUR to USD exchange rate
         fx = yf.Ticker("EURUSD=X")
@@ -111,6 +135,17 @@ async def on_message(message):
 
     content = message.content.strip().lower()
 
+    # Mods can check event loop lag with !lag
+    if content == "!lag" and message.guild:
+        roles = [role.name.lower() for role in getattr(message.author, "roles", [])]
+        if 'moderator' in roles or 'admin' in roles:
+            # DM it: the summary includes stack traces with local file paths
+            await message.author.send(watchdog.summary())
+            await message.channel.send("Sent you the lag report by DM.")
+        else:
+            await message.channel.send("You don't have permission to use this command.")
+        return
+
     # Respond to DMs
     if isinstance(message.channel, discord.DMChannel):
         if content in {"wen", "when", "schedule", "next"}:
@@ -167,8 +202,21 @@ async def check_rate_limit():
 @client.event
 async def on_ready():
     print(f"✅ Metaplanet DN3 Bot Logged in as {client.user}")
-    last_status = None
-    global update_count
+    global update_count, last_status, update_loop_running
+    if watchdog.loop_thread_id is None:  # on_ready fires again after reconnects
+        watchdog.start(asyncio.get_running_loop())
+
+    # on_ready fires again after reconnects; keep a single update loop
+    if update_loop_running:
+        last_status = None  # Let the running loop re-send the status
+        return
+    update_loop_running = True
+
+    # Show the pre-restart status until the first fetch replaces it
+    if restored_status:
+        last_status = f"{restored_status} (stale)"
+        await client.change_presence(activity=discord.CustomActivity(name=last_status))
+    last_snapshot = time.time()
 
     while True:
         try:
@@ -194,6 +242,12 @@ async def on_ready():
             else:
                 print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ Status unchanged, skipping update.")
 
+            # Save the status at intervals for a warm restart, and write out new ticks
+            if time.time() - last_snapshot >= SNAPSHOT_SECONDS:
+                last_snapshot = time.time()
+                await asyncio.to_thread(save_snapshot)
+                await asyncio.to_thread(tick_store.write, tick_store.take_pending())
+
             await asyncio.sleep(15)
 
         except Exception as e:
@@ -203,3 +257,13 @@ async def on_ready():
 
 # Run the bot
 client.run(TOKEN)
+
+# client.run returns once the bot is shut down (e.g. Ctrl+C)
+try:
+    tick_store.write(tick_store.take_pending())
+except Exception as e:
+    print(f"Error writing ticks: {e}")
+try:
+    save_snapshot()
+except Exception as e:
+    print(f"Error saving snapshot: {e}")
@@ -9,6 +9,12 @@ import aiohttp
 from datetime import datetime, timedelta
 import pytz
 import json
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent / "multibot"))  # Helpers shared with the multibot runner
+from loop_watchdog import LoopWatchdog
+from snapshot import save_status, load_status
+from ticks import TickStore
 
 # Load environment variables
 env_path = Path(__file__).parent / ".env.mtplf"
@@ -23,6 +29,22 @@ client = discord.Client(intents=intents)
 
 update_count = 0  # Count how many update cycles have occurred
 
+watchdog = LoopWatchdog(Path(__file__).parent / "watchdog.log", 0.25)  # 250 ms
+
+# Intraday prices, drawn by the 3350 bot's /chart
+tick_store = TickStore(Path(__file__).parent / "ticks", 24 * 3600)
+tick_store.load(["MTPLF"])
+
+# Last status, saved so a restart has something to show right away
+snapshot_path = Path(__file__).parent / "snapshot_mtplf.json"
+SNAPSHOT_SECONDS = 60
+last_status = None  # Track last status to avoid redundant updates
+update_loop_running = False
+restored_status = load_status(snapshot_path, 72 * 3600).get("status")
+
+def save_snapshot():
+    save_status(snapshot_path, last_status)
+
 # Setup path for banned_words.json in same folder as this script
 script_folder = Path(__file__).parent
 banned_words_path = script_folder / "banned_words.json"
@@ -73,6 +95,7 @@ def get_mtplf_price_and_change():
         prev_close = data['Close'].iloc[-2]
         last = data['Close'].iloc[-1]
         change = ((last - prev_close) / prev_close) * 100
+        tick_store.append("MTPLF", time.time(), float(last))
 
         # Fetch USD/JPY exchange rate
         fx = yf.Ticker("JPY=X")
@@ -103,8 +126,21 @@ async def check_rate_limit():
 @client.event
 async def on_ready():
     print(f"âœ”ï¸ Metaplanet Bot Logged in as {client.user}")
-    last_status = None
-    global update_count
+    global update_count, last_status, update_loop_running
+    if watchdog.loop_thread_id is None:  # on_ready fires again after reconnects
+        watchdog.start(asyncio.get_running_loop())
+
+    # on_ready fires again after reconnects; keep a single update loop
+    if update_loop_running:
+        last_status = None  # Let the running loop re-send the status
+        return
+    update_loop_running = True
+
+    # Show the pre-restart status until the first fetch replaces it
+    if restored_status:
+        last_status = f"{restored_status} (stale)"
+        await client.change_presence(activity=discord.CustomActivity(name=last_status))
+    last_snapshot = time.time()
 
     while True:
         try:
@@ -134,6 +170,12 @@ async def on_ready():
             else:
                 print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] âš ï¸ Status unchanged, skipping update.")
 
+            # Save the status at intervals for a warm restart, and write out new ticks
+            if time.time() - last_snapshot >= SNAPSHOT_SECONDS:
+                last_snapshot = time.time()
+                await asyncio.to_thread(save_snapshot)
+                await asyncio.to_thread(tick_store.write, tick_store.take_pending())
+
             await asyncio.sleep(15)
 
         except Exception as e:
@@ -153,6 +195,15 @@ async def on_message(message):
         roles = [role.name.lower() for role in member.roles]
         return 'moderator' in roles or 'admin' in roles
 
+    if content_lower == "!lag" and message.guild:
+        if not is_mod_or_admin(message.author):
+            await message.channel.send("You don't have permission to use this command.")
+            return
+        # DM it: the summary includes stack traces with local file paths
+        await message.author.send(watchdog.summary())
+        await message.channel.send("Sent you the lag report by DM.")
+        return
+
     if content_lower.startswith("!add-bad") or content_lower.startswith("!remove-bad") or content_lower.startswith("!list-bad"):
         if not is_mod_or_admin(message.author):
             await message.channel.send("âŒ You don't have permission to use this command.")
@@ -264,3 +315,13 @@ async def on_message(message):
 
 # Run the bot
 client.run(TOKEN)
+
+# client.run returns once the bot is shut down (e.g. Ctrl+C)
+try:
+    tick_store.write(tick_store.take_pending())
+except Exception as e:
+    print(f"Error writing ticks: {e}")
+try:
+    save_snapshot()
+except Exception as e:
+    print(f"Error saving snapshot: {e}")
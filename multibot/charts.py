@@ -0,0 +1,135 @@
+"""PNG sparklines and candlesticks for /chart.
+
+render_chart runs in a worker process (it's CPU work and would otherwise
+stall the bots' event loop), so it only takes plain arrays and returns
+PNG bytes. ChartCache sits in front of it on the bot side.
+"""
+import asyncio
+import io
+import re
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+WIDTH = 480
+HEIGHT = 160
+PADDING = 8
+HEADER = 18
+CANDLE_PX = 6
+
+BACKGROUND = (49, 51, 56)  # Discord dark theme
+TEXT = (219, 222, 225)
+UP = (35, 165, 90)
+DOWN = (242, 63, 67)
+
+WINDOW_UNITS = {"m": 60, "h": 3600, "d": 86400}
+
+
+def parse_window(text):
+    """ "30m", "4h", "1d" -> seconds. Returns None if it doesn't parse."""
+    match = re.fullmatch(r"\s*(\d+)\s*([mhd])\s*", text.lower())
+    if not match:
+        return None
+    return int(match.group(1)) * WINDOW_UNITS[match.group(2)]
+
+
+def downsample(times, prices, start, end, buckets):
+    """Open/high/low/close per time bucket, all in one pass with reduceat.
+
+    Returns the bucket index of each non-empty bucket plus its OHLC values,
+    so a day of 15 second ticks collapses to one value per pixel column.
+    """
+    idx = ((times - start) / (end - start) * buckets).astype(np.int64)
+    idx = np.clip(idx, 0, buckets - 1)
+    starts = np.flatnonzero(np.r_[True, idx[1:] != idx[:-1]])
+    ends = np.r_[starts[1:] - 1, len(prices) - 1]
+    return (
+        idx[starts],
+        prices[starts],
+        np.maximum.reduceat(prices, starts),
+        np.minimum.reduceat(prices, starts),
+        prices[ends],
+    )
+
+
+def render_chart(title, times, prices, start, end, style="line", width=WIDTH, height=HEIGHT):
+    image = Image.new("RGB", (width, height), BACKGROUND)
+    draw = ImageDraw.Draw(image)
+
+    left, right = PADDING, width - PADDING
+    top, bottom = PADDING + HEADER, height - PADDING
+    plot_width = right - left
+
+    if style == "candle":
+        buckets = max(plot_width // CANDLE_PX, 1)
+    else:
+        buckets = plot_width
+    cols, opens, highs, lows, closes = downsample(times, prices, start, end, buckets)
+
+    lo, hi = float(lows.min()), float(highs.max())
+    if hi == lo:
+        hi, lo = hi + 1, lo - 1  # Flat line: keep it in the middle
+
+    def y(values):
+        return bottom - (values - lo) / (hi - lo) * (bottom - top)
+
+    x_scale = plot_width / buckets
+    change = (closes[-1] - opens[0]) / opens[0] * 100 if opens[0] else 0.0
+    colour = UP if change >= 0 else DOWN
+
+    if style == "candle":
+        xs = left + (cols + 0.5) * x_scale
+        half = max(x_scale / 2 - 1, 1)
+        for x, o, h, l, c in zip(xs, y(opens), y(highs), y(lows), y(closes)):
+            fill = UP if c <= o else DOWN  # Screen y grows downwards
+            draw.line([(x, h), (x, l)], fill=fill)
+            draw.rectangle([x - half, min(o, c), x + half, max(o, c)], fill=fill)
+    else:
+        xs = left + cols * x_scale
+        # Min/max whisker per column keeps spikes visible after downsampling
+        for x, h, l in zip(xs, y(highs), y(lows)):
+            if l - h >= 1:
+                draw.line([(x, h), (x, l)], fill=colour)
+        points = list(zip(xs.tolist(), y(closes).tolist()))
+        if len(points) > 1:
+            draw.line(points, fill=colour, width=2)
+        else:
+            draw.point(points, fill=colour)
+
+    draw.text((PADDING, 4), title, fill=TEXT)
+    summary = f"H {hi:,.2f}  L {lo:,.2f}  {change:+.2f}%"
+    draw.text((width - PADDING - draw.textlength(summary), 4), summary, fill=colour)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class ChartCache:
+    """LRU of rendered charts, keyed by (symbol, window, style, time bucket).
+
+    Entries are futures, so a burst of identical /chart requests that
+    arrives while the first render is still running shares that render.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+
+    def get(self, key, render):
+        future = self.entries.get(key)
+        if future is not None:
+            self.entries.move_to_end(key)
+            return asyncio.shield(future)
+
+        future = asyncio.ensure_future(render())
+        self.entries[key] = future
+        future.add_done_callback(lambda f: self.discard_failed(key, f))
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return asyncio.shield(future)
+
+    def discard_failed(self, key, future):
+        if (future.cancelled() or future.exception()) and self.entries.get(key) is future:
+            del self.entries[key]
@@ -0,0 +1,212 @@
+"""Load bots.toml for the multi-symbol runner.
+
+Everything that used to be hard-coded in each *_main.py script (ticker,
+currency, FX leg, env file, market hours, poll interval) lives in the
+config file instead. The loader fills in defaults and checks references
+up front so a typo fails at startup rather than mid-cycle.
+"""
+import tomllib
+from datetime import datetime
+from pathlib import Path
+
+import pytz
+from dotenv import dotenv_values
+
+SOURCES = {"yahoo", "tradegate", "coingecko"}
+FX_FALLBACKS = {"exchangerate_host"}
+
+DEFAULT_POLL_SECONDS = 15
+DEFAULT_CLOSED_POLL_SECONDS = 300
+DEFAULT_FX_POLL_SECONDS = 60
+DEFAULT_PRESENCE_SECONDS = 15
+DEFAULT_YAHOO_BATCH_SIZE = 25
+DEFAULT_MAX_CONCURRENT_FETCHES = 4
+DEFAULT_FETCH_TIMEOUT_SECONDS = 10
+DEFAULT_TICK_RETENTION_HOURS = 24
+DEFAULT_CHART_BUCKET_SECONDS = 60
+DEFAULT_CHART_CACHE_SIZE = 64
+DEFAULT_CHART_WORKERS = 2
+DEFAULT_WATCHDOG_THRESHOLD_MS = 250
+DEFAULT_WATCHDOG_INTERVAL_SECONDS = 0.5
+DEFAULT_SNAPSHOT_SECONDS = 60
+DEFAULT_SNAPSHOT_MAX_AGE_HOURS = 72
+PLACEHOLDER_TOKEN = "Put the token here"  # what the checked-in .env files contain
+
+
+def parse_session(text):
+    """Turn "09:00-11:30" into a pair of datetime.time objects."""
+    try:
+        start, end = (part.strip() for part in text.split("-"))
+        open_time = datetime.strptime(start, "%H:%M").time()
+        close_time = datetime.strptime(end, "%H:%M").time()
+    except ValueError:
+        raise ValueError(f"Invalid session '{text}', expected HH:MM-HH:MM")
+    if close_time <= open_time:
+        raise ValueError(f"Session '{text}' closes before it opens")
+    return open_time, close_time
+
+
+def load_venues(raw):
+    venues = {}
+    for name, spec in raw.items():
+        sessions = sorted(parse_session(s) for s in spec.get("sessions", []))
+        if not sessions:
+            raise ValueError(f"Venue '{name}' has no sessions")
+        venues[name] = {
+            "name": spec.get("label", name),
+            "tz": pytz.timezone(spec["timezone"]),
+            "sessions": sessions,
+            "weekdays": set(spec.get("weekdays", [0, 1, 2, 3, 4])),  # Monday=0
+        }
+    return venues
+
+
+def load_fx(raw, defaults):
+    """FX legs are polled like any other symbol, under the key "fx:<PAIR>".
+
+    A pair named BASEQUOTE (e.g. USDJPY) holds how many QUOTE one BASE buys,
+    matching Yahoo's JPY=X / EURUSD=X conventions.
+    """
+    pairs = {}
+    for pair, spec in raw.items():
+        if isinstance(spec, str):
+            spec = {"symbol": spec}
+        if len(pair) != 6:
+            raise ValueError(f"FX pair '{pair}' should look like USDJPY")
+        fallback = spec.get("fallback")
+        if fallback and fallback not in FX_FALLBACKS:
+            raise ValueError(f"FX pair '{pair}' has unknown fallback '{fallback}'")
+        poll = spec.get("poll_seconds", defaults["fx_poll_seconds"])
+        pairs[pair] = {
+            "key": f"fx:{pair}",
+            "label": pair,
+            "source": "yahoo",
+            "symbol": spec["symbol"],
+            "base": pair[:3],
+            "quote": pair[3:],
+            "fallback": fallback,
+            "currency": pair[3:],
+            "venue": None,
+            "poll_seconds": poll,
+            "closed_poll_seconds": poll,
+        }
+    return pairs
+
+
+def resolve_conversion(key, currency, target, fx):
+    """Find the FX leg that turns `currency` into `target`."""
+    if f"{currency}{target}" in fx:
+        return {"pair": f"fx:{currency}{target}", "op": "multiply", "currency": target}
+    if f"{target}{currency}" in fx:
+        return {"pair": f"fx:{target}{currency}", "op": "divide", "currency": target}
+    raise ValueError(f"Symbol '{key}' converts {currency} to {target} but no FX pair covers it")
+
+
+def load_symbols(raw, defaults, venues, fx):
+    symbols = {}
+    for key, spec in raw.items():
+        source = spec.get("source", "yahoo")
+        if source not in SOURCES:
+            raise ValueError(f"Symbol '{key}' has unknown source '{source}'")
+        venue = spec.get("venue")
+        if venue and venue not in venues:
+            raise ValueError(f"Symbol '{key}' uses unknown venue '{venue}'")
+        if source == "tradegate":
+            remote = spec["isin"]
+        elif source == "coingecko":
+            remote = spec["id"]
+        else:
+            remote = spec["symbol"]
+
+        currency = spec["currency"]
+        convert_to = spec.get("convert_to")
+        poll = spec.get("poll_seconds", defaults["poll_seconds"])
+        symbols[key] = {
+            "key": key,
+            "label": spec.get("label", key),
+            "source": source,
+            "symbol": remote,
+            "currency": currency,
+            "venue": venue,
+            "conversion": resolve_conversion(key, currency, convert_to, fx) if convert_to else None,
+            "poll_seconds": poll,
+            "closed_poll_seconds": spec.get("closed_poll_seconds", defaults["closed_poll_seconds"]),
+        }
+    return symbols
+
+
+def load_bots(raw, base, symbols):
+    bots = []
+    for spec in raw:
+        name = spec["name"]
+        keys = spec.get("symbols", [])
+        if not keys:
+            raise ValueError(f"Bot '{name}' has no symbols")
+        for key in keys:
+            if key not in symbols:
+                raise ValueError(f"Bot '{name}' references unknown symbol '{key}'")
+
+        # dotenv_values rather than load_dotenv: every .env file uses the same
+        # DISCORD_BOT_TOKEN name, so they can't all go into os.environ.
+        env_path = base / spec["env"]
+        token_var = spec.get("token_var", "DISCORD_BOT_TOKEN")
+        token = dotenv_values(env_path).get(token_var)
+        if not token:
+            raise ValueError(f"Bot '{name}': {token_var} not set in {env_path}")
+        if token.strip() == PLACEHOLDER_TOKEN:
+            raise ValueError(f"Bot '{name}': {token_var} in {env_path} is still the placeholder, put the bot's token there")
+
+        bots.append({
+            "name": name,
+            "token": token,
+            "symbols": keys,
+            "guild_ids": spec.get("guild_ids") or None,
+            "presence_seconds": spec.get("presence_seconds", DEFAULT_PRESENCE_SECONDS),
+        })
+    return bots
+
+
+def load_config(path):
+    path = Path(path)
+    with open(path, "rb") as f:
+        raw = tomllib.load(f)
+
+    raw_defaults = raw.get("defaults", {})
+    defaults = {
+        "poll_seconds": raw_defaults.get("poll_seconds", DEFAULT_POLL_SECONDS),
+        "closed_poll_seconds": raw_defaults.get("closed_poll_seconds", DEFAULT_CLOSED_POLL_SECONDS),
+        "fx_poll_seconds": raw_defaults.get("fx_poll_seconds", DEFAULT_FX_POLL_SECONDS),
+        "yahoo_batch_size": raw_defaults.get("yahoo_batch_size", DEFAULT_YAHOO_BATCH_SIZE),
+        "max_concurrent_fetches": raw_defaults.get("max_concurrent_fetches", DEFAULT_MAX_CONCURRENT_FETCHES),
+        "fetch_timeout_seconds": raw_defaults.get("fetch_timeout_seconds", DEFAULT_FETCH_TIMEOUT_SECONDS),
+        "tick_retention_hours": raw_defaults.get("tick_retention_hours", DEFAULT_TICK_RETENTION_HOURS),
+        "chart_bucket_seconds": raw_defaults.get("chart_bucket_seconds", DEFAULT_CHART_BUCKET_SECONDS),
+        "chart_cache_size": raw_defaults.get("chart_cache_size", DEFAULT_CHART_CACHE_SIZE),
+        "chart_workers": raw_defaults.get("chart_workers", DEFAULT_CHART_WORKERS),
+        "watchdog_threshold_ms": raw_defaults.get("watchdog_threshold_ms", DEFAULT_WATCHDOG_THRESHOLD_MS),
+        "watchdog_interval_seconds": raw_defaults.get("watchdog_interval_seconds", DEFAULT_WATCHDOG_INTERVAL_SECONDS),
+        "watchdog_slow_callbacks": raw_defaults.get("watchdog_slow_callbacks", False),
+        "snapshot_seconds": raw_defaults.get("snapshot_seconds", DEFAULT_SNAPSHOT_SECONDS),
+        "snapshot_max_age_hours": raw_defaults.get("snapshot_max_age_hours", DEFAULT_SNAPSHOT_MAX_AGE_HOURS),
+    }
+
+    venues = load_venues(raw.get("venues", {}))
+    fx = load_fx(raw.get("fx", {}), defaults)
+    symbols = load_symbols(raw.get("symbols", {}), defaults, venues, fx)
+    bots = load_bots(raw.get("bots", []), path.parent, symbols)
+    if not bots:
+        raise ValueError(f"No [[bots]] defined in {path}")
+
+    # FX legs are scheduled alongside the symbols that need them.
+    feeds = dict(symbols)
+    for pair in fx.values():
+        feeds[pair["key"]] = pair
+
+    return {
+        "defaults": defaults,
+        "venues": venues,
+        "fx": fx,
+        "symbols": symbols,
+        "feeds": feeds,
+        "bots": bots,
+    }
@@ -0,0 +1,175 @@
+"""Event-loop lag watchdog.
+
+A coroutine wakes every `interval` seconds and records how late it woke
+up; that lateness is time the loop spent stuck in something synchronous
+(a yfinance call, a file write, ...). A separate thread watches the same
+heartbeat, and once the loop has been stuck past the threshold it grabs
+the loop thread's current stack, which is the code doing the blocking.
+asyncio's own slow-callback warnings can be collected too, but that needs
+asyncio debug mode, which slows every callback, so it's opt-in.
+
+All file writes happen on the sampler thread, never on the loop. The log
+rotates at a fixed size, and a stack that keeps blocking the loop is
+written out in full once, then only counted; the console gets one line.
+"""
+import asyncio
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+
+LOG_MAX_BYTES = 1_000_000
+LOG_BACKUPS = 3
+REPEAT_NOTE_SECONDS = 600  # how often to mention a stack that keeps recurring
+
+
+def stamp(t=None):
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(t))
+
+
+class SlowCallbackHandler(logging.Handler):
+    """Picks asyncio's "Executing <Handle ...> took 0.412 seconds" warnings out of its logger."""
+
+    def __init__(self, watchdog):
+        super().__init__(level=logging.WARNING)
+        self.watchdog = watchdog
+
+    def emit(self, record):
+        message = record.getMessage()
+        if message.startswith("Executing "):
+            self.watchdog.slow_callbacks.append((time.time(), message))
+            self.watchdog.log_lines.put(f"Slow callback: {message}")
+        else:
+            print(f"[{stamp()}] asyncio: {message}")
+
+
+class LoopWatchdog:
+    def __init__(self, log_path, threshold, interval=0.5, history_seconds=300):
+        self.log_path = log_path
+        self.threshold = threshold
+        self.interval = interval
+        self.lags = deque(maxlen=int(history_seconds / interval))  # (unix time, lag seconds)
+        self.stalls = deque(maxlen=20)          # {"time", "stack", "duration"}
+        self.slow_callbacks = deque(maxlen=20)  # (unix time, message)
+        self.log_lines = queue.SimpleQueue()  # from the loop thread, written by the sampler
+        self.stack_counts = {}  # stack signature -> times it blocked the loop
+        self.repeat_notes = {}  # stack signature -> when it was last mentioned
+        self.heartbeat = time.monotonic()
+        self.current_stall = None
+        self.loop_thread_id = None
+
+        self.logger = logging.getLogger(f"loop_watchdog.{log_path}")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        if not self.logger.handlers:
+            handler = logging.handlers.RotatingFileHandler(
+                log_path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8", delay=True
+            )
+            handler.setFormatter(logging.Formatter("[%(asctime)s] %(message)s", "%Y-%m-%d %H:%M:%S"))
+            self.logger.addHandler(handler)
+
+    def start(self, loop, slow_callbacks=False):
+        """Call from the event loop's thread. slow_callbacks turns on asyncio debug mode."""
+        self.loop_thread_id = threading.get_ident()
+        # The watchdog may have been built long before the loop got going (e.g. at
+        # import, started from on_ready after login); don't count that as a stall.
+        self.heartbeat = time.monotonic()
+        if slow_callbacks:
+            loop.slow_callback_duration = self.threshold
+            loop.set_debug(True)
+            logging.getLogger("asyncio").addHandler(SlowCallbackHandler(self))
+
+        self.task = loop.create_task(self.measure())
+        threading.Thread(target=self.sample, name="loop-watchdog", daemon=True).start()
+        print(f"[{stamp()}] Loop watchdog started (threshold {self.threshold * 1000:.0f} ms)")
+
+    async def measure(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.heartbeat = now
+            lag = max(now - expected, 0.0)
+            self.lags.append((time.time(), lag))
+
+            stall = self.current_stall
+            if stall is not None:
+                stall["duration"] = lag
+                self.current_stall = None
+
+    def sample(self):
+        written = None
+        while True:
+            time.sleep(self.threshold / 2)
+
+            blocked = time.monotonic() - self.heartbeat - self.interval
+            if blocked > self.threshold and self.current_stall is None:
+                frame = sys._current_frames().get(self.loop_thread_id)
+                frames = traceback.extract_stack(frame) if frame else []
+                stall = {"time": time.time(), "stack": "".join(traceback.format_list(frames)) or "(no frame)", "duration": None}
+                self.stalls.append(stall)
+                self.current_stall = stall
+                self.record_stall(frames, stall, blocked)
+                if self.stack_counts[self.signature(frames)] == 1:
+                    written = stall
+
+            if written is not None and written["duration"] is not None:
+                self.logger.info(f"Event loop recovered after {written['duration']:.2f}s")
+                written = None
+
+            while not self.log_lines.empty():
+                self.logger.info(self.log_lines.get())
+
+    def signature(self, frames):
+        # Files and functions only: line numbers in the innermost frames vary
+        # depending on exactly where inside the blocking call the sample lands.
+        return tuple((f.filename, f.name) for f in frames)
+
+    def record_stall(self, frames, stall, blocked):
+        key = self.signature(frames)
+        count = self.stack_counts.get(key, 0) + 1
+        self.stack_counts[key] = count
+        where = f"{frames[-1].filename}:{frames[-1].lineno} in {frames[-1].name}" if frames else "unknown"
+
+        if count == 1:
+            self.repeat_notes[key] = stall["time"]
+            self.logger.info(f"Event loop blocked for {blocked:.2f}s so far, loop thread stack:\n{stall['stack']}")
+            print(f"[{stamp()}] Event loop blocked {blocked:.2f}s at {where} (new stack, see {self.log_path})")
+        elif stall["time"] - self.repeat_notes[key] >= REPEAT_NOTE_SECONDS:
+            self.repeat_notes[key] = stall["time"]
+            message = f"Event loop blocked {blocked:.2f}s at {where} (same stack as before, {count} times so far)"
+            self.logger.info(message)
+            print(f"[{stamp()}] {message}")
+
+    def summary(self, max_length=1900):
+        """Short report for the /lag command, kept under Discord's message limit."""
+        now = time.time()
+        recent = [lag for t, lag in self.lags if t >= now - 300]
+        if not recent:
+            return "No lag measurements yet."
+
+        lines = [
+            f"Loop lag now {recent[-1] * 1000:.0f} ms, "
+            f"avg {sum(recent) / len(recent) * 1000:.0f} ms, "
+            f"max {max(recent) * 1000:.0f} ms over the last 5 minutes.",
+            f"Stalls over {self.threshold * 1000:.0f} ms since start: {sum(self.stack_counts.values())} "
+            f"from {len(self.stack_counts)} distinct stacks",
+        ]
+
+        for t, message in list(self.slow_callbacks)[-3:]:
+            lines.append(f"{stamp(t)} {message[:200]}")
+
+        if self.stalls:
+            stall = self.stalls[-1]
+            duration = f"{stall['duration']:.2f}s" if stall["duration"] is not None else "ongoing"
+            header = f"Last stall at {stamp(stall['time'])} ({duration}), innermost frames last:"
+            room = max(max_length - sum(len(line) + 1 for line in lines) - len(header) - 10, 200)
+            lines.append(header)
+            lines.append(f"```\n{stall['stack'][-room:]}```")
+
+        return "\n".join(lines)
@@ -0,0 +1,435 @@
+import discord
+import asyncio
+import io
+import sys
+import time
+from pathlib import Path
+from datetime import datetime, timedelta
+import aiohttp
+from concurrent.futures import ProcessPoolExecutor
+
+from config import load_config
+from sources import fetch_yahoo, fetch_tradegate, fetch_coingecko, fetch_exchangerate_host
+from ticks import TickStore, safe_name
+from charts import ChartCache, parse_window, render_chart
+from loop_watchdog import LoopWatchdog
+from snapshot import save_snapshot, load_snapshot
+
+# Config path can be given on the command line; defaults to bots.toml next to this script
+CONFIG_PATH = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).parent / "bots.toml"
+TICKS_FOLDER = Path(__file__).parent / "ticks"
+WATCHDOG_LOG = Path(__file__).parent / "watchdog.log"
+SNAPSHOT_PATH = Path(__file__).parent / "snapshot.json"
+
+quotes = {}    # feed key -> {"price", "change", "time"}, plus "stale" if restored from the snapshot
+next_due = {}  # feed key -> unix time of the next fetch
+in_flight = set()  # fetch tasks still running, so they aren't garbage collected
+presence_status = {}    # bot name -> last status pushed to Discord
+restored_presence = {}  # bot name -> status from the snapshot, until its quotes arrive
+
+# Set up in main()
+tick_store = None
+chart_cache = None
+chart_pool = None
+watchdog = None
+
+
+def stamp():
+    return time.strftime('%Y-%m-%d %H:%M:%S')
+
+# === Market Hours ===
+
+def venue_is_open(venue):
+    if venue is None:
+        return True  # No venue means it trades around the clock (e.g. BTC)
+
+    now = datetime.now(venue["tz"])
+    if now.weekday() not in venue["weekdays"]:
+        return False
+    return any(open_time <= now.time() < close_time for open_time, close_time in venue["sessions"])
+
+def get_market_events(venue):
+    """Next event for a venue as [(label, minutes)], rolling over to the next trading day."""
+    sessions = venue["sessions"]
+    events = []
+    for i, (open_time, close_time) in enumerate(sessions):
+        events.append(("Market Open" if i == 0 else "Market Reopen", open_time))
+        events.append(("Market Close" if i == len(sessions) - 1 else "Lunch Break", close_time))
+
+    now = datetime.now(venue["tz"])
+    day = now.date()
+    for _ in range(8):
+        if day.weekday() in venue["weekdays"]:
+            for label, event_time in events:
+                event_dt = venue["tz"].localize(datetime.combine(day, event_time))
+                if event_dt > now:
+                    return [(label, int((event_dt - now).total_seconds() // 60))]
+        day += timedelta(days=1)
+    return []
+
+def format_minutes(minutes):
+    hours = minutes // 60
+    mins = minutes % 60
+    parts = []
+    if hours > 0:
+        parts.append(f"{hours} hour{'s' if hours != 1 else ''}")
+    if mins > 0 or not parts:
+        parts.append(f"{mins} minute{'s' if mins != 1 else ''}")
+    return " ".join(parts)
+
+# === Formatting ===
+
+def format_price(value, currency):
+    if currency == "JPY":
+        if value >= 100_000_000:
+            return f"¥{value / 100_000_000:.2f}億"
+        if value >= 10_000:
+            return f"¥{value / 10_000:.2f}万"
+        return f"¥{value:.0f}"
+    if currency == "USD":
+        return f"${value / 1000:.1f}k" if value >= 1000 else f"${value:.2f}"
+    if currency == "EUR":
+        return f"€{value:.2f}"
+    return f"{value:.2f} {currency}"
+
+def convert_price(config, symbol, price):
+    conversion = symbol["conversion"]
+    if not conversion:
+        return None
+    fx = quotes.get(conversion["pair"])
+    if not fx or not fx["price"]:
+        return None
+    if conversion["op"] == "multiply":
+        return price * fx["price"]
+    return price / fx["price"]
+
+def is_stale(symbol):
+    keys = [symbol["key"]]
+    if symbol["conversion"]:
+        keys.append(symbol["conversion"]["pair"])
+    return any(quotes.get(key, {}).get("stale") for key in keys)
+
+def build_status(config, key, with_label=False):
+    symbol = config["symbols"][key]
+    quote = quotes.get(key)
+
+    if quote and quote["price"] > 0:
+        parts = [format_price(quote["price"], symbol["currency"])]
+        converted = convert_price(config, symbol, quote["price"])
+        if converted:
+            parts.append(format_price(converted, symbol["conversion"]["currency"]))
+        parts.append(f"{quote['change']:+.2f}%")
+        status = "  ".join(parts)
+        if is_stale(symbol):
+            status += " (stale)"
+    else:
+        status = "Price not found"
+
+    return f"{symbol['label']} {status}" if with_label else status
+
+def is_mod_or_admin(member):
+    roles = [role.name.lower() for role in getattr(member, "roles", [])]
+    return 'moderator' in roles or 'admin' in roles
+
+def find_symbol(config, name):
+    name = name.strip().lower()
+    for key, symbol in config["symbols"].items():
+        if name in (key.lower(), symbol["label"].lower(), symbol["symbol"].lower()):
+            return key
+    return None
+
+# === Polling ===
+
+def record_quote(key, price, change):
+    now = time.time()
+    quotes[key] = {"price": price, "change": change, "time": now}
+    tick_store.append(key, now, price)
+
+async def run_fetch(session, semaphore, timeout, feeds, fetch):
+    """Run one upstream request and file its results under each feed's key.
+
+    Each request runs as its own task with its own timeout, so one hung
+    source only delays the feeds it covers.
+    """
+    async with semaphore:
+        try:
+            results = await asyncio.wait_for(fetch, timeout)
+        except asyncio.TimeoutError:
+            print(f"[{stamp()}] Timed out fetching {', '.join(f['key'] for f in feeds)} after {timeout}s")
+            results = {}
+        except Exception as e:
+            print(f"[{stamp()}] Error fetching {', '.join(f['key'] for f in feeds)}: {e}")
+            results = {}
+
+    for feed in feeds:
+        if feed["symbol"] in results:
+            price, change = results[feed["symbol"]]
+            record_quote(feed["key"], price, change)
+        elif feed.get("fallback"):
+            await run_fx_fallback(session, semaphore, timeout, feed)
+
+async def run_fx_fallback(session, semaphore, timeout, feed):
+    async with semaphore:
+        try:
+            rate = await asyncio.wait_for(fetch_exchangerate_host(session, feed["base"], feed["quote"]), timeout)
+        except Exception as e:
+            print(f"[{stamp()}] Fallback for {feed['label']} failed: {e}")
+            return
+    if rate:
+        print(f"[{stamp()}] {feed['label']} from exchangerate.host: {rate}")
+        record_quote(feed["key"], float(rate), 0.0)
+
+async def poll_due(config, session, semaphore):
+    now = time.time()
+    due = [feed for key, feed in config["feeds"].items() if next_due.get(key, 0) <= now]
+    if not due:
+        return
+
+    # Schedule the next fetch up front so a failing source retries on its normal interval
+    for feed in due:
+        venue = config["venues"].get(feed["venue"]) if feed["venue"] else None
+        interval = feed["poll_seconds"] if venue_is_open(venue) else feed["closed_poll_seconds"]
+        next_due[feed["key"]] = now + interval
+
+    timeout = config["defaults"]["fetch_timeout_seconds"]
+    jobs = []
+    yahoo = [feed for feed in due if feed["source"] == "yahoo"]
+    batch_size = config["defaults"]["yahoo_batch_size"]
+    for i in range(0, len(yahoo), batch_size):
+        batch = yahoo[i:i + batch_size]
+        symbols = [feed["symbol"] for feed in batch]
+        jobs.append((batch, asyncio.to_thread(fetch_yahoo, symbols)))
+
+    for feed in due:
+        if feed["source"] == "tradegate":
+            jobs.append(([feed], fetch_tradegate(session, feed["symbol"])))
+
+    coingecko = {}
+    for feed in due:
+        if feed["source"] == "coingecko":
+            coingecko.setdefault(feed["currency"], []).append(feed)
+    for currency, feeds in coingecko.items():
+        ids = [feed["symbol"] for feed in feeds]
+        jobs.append((feeds, fetch_coingecko(session, ids, currency)))
+
+    # Don't wait for the jobs here: the poller keeps ticking and other feeds
+    # come due on schedule even while a slow request is outstanding.
+    for feeds, fetch in jobs:
+        task = asyncio.create_task(run_fetch(session, semaphore, timeout, feeds, fetch))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+
+    print(f"[{stamp()}] Polling {len(due)} feeds in {len(jobs)} requests.")
+
+async def poll_forever(config):
+    semaphore = asyncio.Semaphore(config["defaults"]["max_concurrent_fetches"])
+    snapshot_seconds = config["defaults"]["snapshot_seconds"]
+    last_snapshot = time.time()
+
+    timeout = aiohttp.ClientTimeout(total=config["defaults"]["fetch_timeout_seconds"])
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        while True:
+            try:
+                await poll_due(config, session, semaphore)
+            except Exception as e:
+                print(f"[{stamp()}] Error during poll cycle: {e}")
+            try:
+                await asyncio.to_thread(tick_store.write, tick_store.take_pending())
+            except Exception as e:
+                print(f"[{stamp()}] Error writing ticks: {e}")
+
+            if time.time() - last_snapshot >= snapshot_seconds:
+                last_snapshot = time.time()
+                try:
+                    await asyncio.to_thread(save_snapshot, SNAPSHOT_PATH, dict(quotes), dict(presence_status))
+                except Exception as e:
+                    print(f"[{stamp()}] Error saving snapshot: {e}")
+
+            await asyncio.sleep(1)
+
+# === Charts ===
+
+async def get_chart(config, key, window, seconds, style):
+    """PNG bytes for a chart, or None if there isn't enough history yet."""
+    bucket = int(time.time() // config["defaults"]["chart_bucket_seconds"])
+
+    async def render():
+        times, prices = tick_store.window(key, seconds)
+        if len(prices) < 2:
+            return None
+        end = time.time()
+        title = f"{config['symbols'][key]['label']} {window}"
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(chart_pool, render_chart, title, times, prices, end - seconds, end, style)
+
+    return await chart_cache.get((key, seconds, style, bucket), render)
+
+# === Bot Behavior ===
+
+async def presence_loop(bot, spec, config):
+    last_status = None
+    rotation = 0
+    keys = spec["symbols"]
+
+    while True:
+        try:
+            # Bots with several symbols rotate through them, one per update
+            key = keys[rotation % len(keys)]
+            rotation += 1
+            status = build_status(config, key, with_label=len(keys) > 1)
+            if key not in quotes and spec["name"] in restored_presence:
+                # Quote expired from the snapshot but the last status didn't: better than nothing
+                status = restored_presence[spec["name"]].removesuffix(" (stale)") + " (stale)"
+
+            if status != last_status:
+                await bot.change_presence(activity=discord.CustomActivity(name=status))
+                last_status = status
+                presence_status[spec["name"]] = status
+                print(f"[{stamp()}] {spec['name']} status updated to: '{status}'")
+
+        except Exception as e:
+            print(f"[{stamp()}] {spec['name']} error updating status: {e}")
+
+        await asyncio.sleep(spec["presence_seconds"])
+
+def build_bot(spec, config):
+    bot = discord.Bot(intents=discord.Intents.default(), debug_guilds=spec["guild_ids"])
+    tasks = {}
+
+    @bot.event
+    async def on_ready():
+        print(f"[{stamp()}] {spec['name']} Bot Logged in as {bot.user}")
+        # on_ready fires again after every reconnect; only start the loop once
+        if "presence" not in tasks:
+            tasks["presence"] = asyncio.create_task(presence_loop(bot, spec, config))
+
+    @bot.slash_command(name="price", description="Show the latest price for a symbol")
+    async def price(ctx: discord.ApplicationContext, symbol: str = None):
+        key = find_symbol(config, symbol) if symbol else spec["symbols"][0]
+        if not key:
+            await ctx.respond(f"Unknown symbol '{symbol}'.")
+            return
+        await ctx.respond(build_status(config, key, with_label=True))
+
+    @bot.slash_command(name="chart", description="Intraday chart for a symbol")
+    async def chart(
+        ctx: discord.ApplicationContext,
+        symbol: str,
+        window: str = "1d",
+        style: discord.Option(str, choices=["line", "candle"], default="line") = "line",
+    ):
+        key = find_symbol(config, symbol)
+        if not key:
+            await ctx.respond(f"Unknown symbol '{symbol}'.")
+            return
+
+        seconds = parse_window(window)
+        max_hours = config["defaults"]["tick_retention_hours"]
+        if not seconds or seconds > max_hours * 3600:
+            await ctx.respond(f"Window should look like 30m, 4h or 1d (up to {max_hours}h).")
+            return
+
+        await ctx.defer()
+        print(f"[{stamp()}] /chart {key} {window} {style} called")
+        png = await get_chart(config, key, window.strip().lower(), seconds, style)
+        if png is None:
+            await ctx.respond(f"Not enough price history for {config['symbols'][key]['label']} yet.")
+            return
+        await ctx.respond(file=discord.File(io.BytesIO(png), filename=f"{safe_name(key)}-{window.strip()}.png"))
+
+    @bot.slash_command(name="lag", description="Event loop lag and recent stalls (mods only)")
+    async def lag(ctx: discord.ApplicationContext):
+        if not is_mod_or_admin(ctx.author):
+            await ctx.respond("You don't have permission to use this command.", ephemeral=True)
+            return
+        await ctx.respond(watchdog.summary(), ephemeral=True)
+
+    @bot.slash_command(name="wen", description="Time until the next market event for a symbol")
+    async def wen(ctx: discord.ApplicationContext, symbol: str = None):
+        key = find_symbol(config, symbol) if symbol else spec["symbols"][0]
+        if not key:
+            await ctx.respond(f"Unknown symbol '{symbol}'.")
+            return
+
+        venue_name = config["symbols"][key]["venue"]
+        if not venue_name:
+            await ctx.respond(f"{config['symbols'][key]['label']} trades around the clock.")
+            return
+
+        venue = config["venues"][venue_name]
+        upcoming = get_market_events(venue)
+        if upcoming:
+            label, minutes = upcoming[0]
+            await ctx.respond(f"{venue['name']} next up: **{label}** in **{format_minutes(minutes)}**.")
+        else:
+            await ctx.respond(f"No upcoming {venue['name']} sessions found.")
+
+    return bot
+
+async def run_bot(name, bot, token):
+    """Run one bot until it stops; a bad token or crash only takes that bot down."""
+    try:
+        await bot.start(token)
+    except discord.LoginFailure as e:
+        print(f"[{stamp()}] {name}: login failed ({e}), check its token. The other bots keep running.")
+    except Exception as e:
+        print(f"[{stamp()}] {name}: stopped with {type(e).__name__}: {e}. The other bots keep running.")
+    finally:
+        if not bot.is_closed():
+            await bot.close()
+
+
+async def main():
+    global tick_store, chart_cache, chart_pool, watchdog
+    config = load_config(CONFIG_PATH)
+    print(f"[{stamp()}] Loaded {len(config['symbols'])} symbols, {len(config['fx'])} FX pairs, "
+          f"{len(config['bots'])} bots from {CONFIG_PATH}")
+
+    defaults = config["defaults"]
+    restored_quotes, restored = load_snapshot(SNAPSHOT_PATH, defaults["snapshot_max_age_hours"] * 3600)
+    quotes.update(restored_quotes)
+    restored_presence.update(restored)
+    if restored_quotes:
+        print(f"[{stamp()}] Restored {len(restored_quotes)} quotes from {SNAPSHOT_PATH.name}, marked stale until refreshed")
+
+    watchdog = LoopWatchdog(
+        WATCHDOG_LOG,
+        defaults["watchdog_threshold_ms"] / 1000,
+        interval=defaults["watchdog_interval_seconds"],
+    )
+    watchdog.start(asyncio.get_running_loop(), slow_callbacks=defaults["watchdog_slow_callbacks"])
+
+    tick_store = TickStore(TICKS_FOLDER, defaults["tick_retention_hours"] * 3600)
+    await asyncio.to_thread(tick_store.load, list(config["feeds"]))
+    chart_cache = ChartCache(defaults["chart_cache_size"])
+    chart_pool = ProcessPoolExecutor(max_workers=defaults["chart_workers"])
+
+    bots = [(spec["name"], build_bot(spec, config), spec["token"]) for spec in config["bots"]]
+    poller = asyncio.create_task(poll_forever(config))
+    try:
+        # Returns once every bot has stopped
+        await asyncio.gather(*(run_bot(name, bot, token) for name, bot, token in bots))
+        print(f"[{stamp()}] No bots left running, exiting")
+    finally:
+        poller.cancel()
+        for task in list(in_flight):
+            task.cancel()
+        chart_pool.shutdown(wait=False, cancel_futures=True)
+        try:
+            tick_store.write(tick_store.take_pending())
+        except Exception as e:
+            print(f"[{stamp()}] Error writing ticks: {e}")
+        try:
+            save_snapshot(SNAPSHOT_PATH, quotes, presence_status)
+            print(f"[{stamp()}] Saved snapshot of {len(quotes)} quotes")
+        except Exception as e:
+            print(f"[{stamp()}] Error saving snapshot: {e}")
+        for _, bot, _ in bots:
+            if not bot.is_closed():
+                await bot.close()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
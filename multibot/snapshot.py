@@ -0,0 +1,70 @@
+"""Quote snapshot for warm restarts.
+
+The runner saves its quotes, FX rates and presence strings to a small JSON
+file every so often and on shutdown. On startup they're loaded back and
+shown straight away, flagged stale until the first real fetch lands.
+save_status / load_status do the same for the single-ticker bots, which
+only have a status string (plus, for 3350, the exchange rate).
+"""
+import json
+import os
+import time
+
+
+def write_json(path, data):
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    # Replace in one step so a crash mid-write never leaves a truncated snapshot
+    os.replace(tmp_path, path)
+
+
+def read_json(path):
+    if not path.exists():
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Ignoring unreadable snapshot {path}: {e}")
+        return None
+
+
+def save_snapshot(path, quotes, presence):
+    """Blocking file I/O: call through asyncio.to_thread while the loop is running."""
+    write_json(path, {"saved": time.time(), "quotes": quotes, "presence": presence})
+
+
+def load_snapshot(path, max_age_seconds):
+    """Returns (quotes, presence), each marked stale, or empty dicts if there's nothing usable."""
+    data = read_json(path)
+    if data is None:
+        return {}, {}
+
+    # Age is checked per quote: a feed that kept failing keeps its old fetch
+    # time even though the file itself was rewritten recently.
+    cutoff = time.time() - max_age_seconds
+    quotes = {
+        key: dict(quote, stale=True)
+        for key, quote in data.get("quotes", {}).items()
+        if quote.get("time", 0) >= cutoff
+    }
+    presence = data.get("presence", {}) if data.get("saved", 0) >= cutoff else {}
+    return quotes, presence
+
+
+def save_status(path, status, **extra):
+    """Save a single-ticker bot's status, plus any extra fields, if it's fresh."""
+    if not status or status.endswith("(stale)") or status == "Price not found":
+        return  # Nothing fresh since the restart; keep the previous snapshot
+    write_json(path, dict(extra, saved=time.time(), status=status))
+
+
+def load_status(path, max_age_seconds):
+    """The saved fields with "status" stripped of any stale marker, or {} if nothing usable."""
+    data = read_json(path)
+    if not data or time.time() - data.get("saved", 0) > max_age_seconds or not data.get("status"):
+        return {}
+    data["status"] = data["status"].removesuffix(" (stale)")
+    print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Restored snapshot {path.name}: '{data['status']}'")
+    return data
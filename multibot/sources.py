@@ -0,0 +1,75 @@
+"""Price fetchers for the multi-symbol runner.
+
+These are the fetch functions from the single-ticker scripts, generalised
+to take the symbol as an argument and to fetch many symbols per request
+where the upstream API allows it. Each returns {symbol: (price, change)}
+and simply leaves out anything it couldn't get.
+"""
+import time
+
+import aiohttp
+import yfinance as yf
+
+
+def fetch_yahoo(symbols):
+    """Blocking: one yf.download call for the whole batch. Run it in a thread."""
+    data = yf.download(symbols, period="5d", group_by="ticker", progress=False, threads=True)
+    results = {}
+
+    for symbol in symbols:
+        try:
+            # Older yfinance returns flat columns for a single ticker.
+            frame = data[symbol] if symbol in data.columns.get_level_values(0) else data
+            closes = frame['Close'].dropna()
+        except KeyError:
+            continue
+
+        if len(closes) >= 2:
+            prev_close = closes.iloc[-2]
+            last = closes.iloc[-1]
+            change = ((last - prev_close) / prev_close) * 100
+            results[symbol] = (float(last), float(change))
+        else:
+            print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Not enough data for {symbol}.")
+
+    return results
+
+
+async def fetch_tradegate(session, isin):
+    url = f"https://www.tradegate.de/refresh.php?isin={isin}"
+    async with session.get(url) as response:
+        data = await response.json(content_type=None)
+
+    # Handle European decimal format for 'last' and 'delta'
+    last_raw = data.get("last")
+    delta_raw = data.get("delta")
+    if isinstance(last_raw, str):
+        last_raw = last_raw.replace(",", ".")
+    if isinstance(delta_raw, str):
+        delta_raw = delta_raw.replace(",", ".").replace("+", "").strip()
+
+    return {isin: (float(last_raw), float(delta_raw))}
+
+
+async def fetch_coingecko(session, ids, currency):
+    vs = currency.lower()
+    url = (
+        "https://api.coingecko.com/api/v3/simple/price"
+        f"?ids={','.join(ids)}&vs_currencies={vs}&include_24hr_change=true"
+    )
+    async with session.get(url) as response:
+        data = await response.json()
+
+    results = {}
+    for coin_id in ids:
+        entry = data.get(coin_id, {})
+        if vs in entry:
+            results[coin_id] = (float(entry[vs]), float(entry.get(f"{vs}_24h_change") or 0.0))
+    return results
+
+
+async def fetch_exchangerate_host(session, base, quote):
+    url = f"https://api.exchangerate.host/latest?base={base}&symbols={quote}"
+    async with session.get(url) as response:
+        fx_json = await response.json()
+    return fx_json.get("rates", {}).get(quote)
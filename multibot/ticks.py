@@ -0,0 +1,119 @@
+"""Intraday tick history for /chart.
+
+Every price the poller records is kept in memory for the retention window
+and appended to a per-symbol, per-day CSV under ticks/ so a restart doesn't
+wipe the chart. Writes are buffered: the event loop hands the buffer over
+with take_pending() and a worker thread writes it out with write(), and
+files that fall entirely outside the retention window are deleted.
+"""
+import re
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+
+def safe_name(key):
+    return re.sub(r"[^\w.-]", "_", key)
+
+
+class TickStore:
+    def __init__(self, folder, retention_seconds):
+        self.folder = Path(folder)
+        self.retention_seconds = retention_seconds
+        self.ticks = {}    # key -> deque of (unix time, price)
+        self.pending = {}  # csv path -> lines not yet written
+        self.last_prune = 0.0
+
+    def path_for(self, key, day):
+        return self.folder / f"{safe_name(key)}-{day:%Y%m%d}.csv"
+
+    def read(self, key):
+        """(time, price) rows from the day files covering the retention window. Blocking file I/O."""
+        cutoff = time.time() - self.retention_seconds
+        today = datetime.now().date()
+        days = [today - timedelta(days=n) for n in range(int(self.retention_seconds // 86400) + 1, -1, -1)]
+
+        rows = []
+        for day in days:
+            path = self.path_for(key, day)
+            if not path.exists():
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        t, price = line.split(",")
+                        t, price = float(t), float(price)
+                    except ValueError:
+                        continue  # Partial line from a crash mid-write
+                    if t >= cutoff:
+                        rows.append((t, price))
+        return rows
+
+    def load(self, keys):
+        """Read back the files still inside the retention window, then prune older ones."""
+        for key in keys:
+            rows = self.ticks.setdefault(key, deque())
+            rows.extend(self.read(key))
+            if rows:
+                print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Loaded {len(rows)} ticks for {key}")
+
+        self.prune()
+
+    def prune(self):
+        """Delete day files whose whole day is older than the retention window."""
+        self.last_prune = time.time()
+        if not self.folder.exists():
+            return
+        cutoff = datetime.fromtimestamp(self.last_prune - self.retention_seconds).date()
+        for path in self.folder.glob("*-*.csv"):
+            match = re.search(r"-(\d{8})\.csv$", path.name)
+            if not match:
+                continue
+            try:
+                day = datetime.strptime(match.group(1), "%Y%m%d").date()
+            except ValueError:
+                continue
+            if day < cutoff:
+                try:
+                    path.unlink()
+                except OSError as e:
+                    print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Could not delete {path}: {e}")
+
+    def append(self, key, t, price):
+        rows = self.ticks.setdefault(key, deque())
+        rows.append((t, price))
+        cutoff = t - self.retention_seconds
+        while rows and rows[0][0] < cutoff:
+            rows.popleft()
+
+        path = self.path_for(key, datetime.fromtimestamp(t).date())
+        self.pending.setdefault(path, []).append(f"{t:.0f},{price}\n")
+
+    def take_pending(self):
+        """Call on the event loop thread, the same thread that appends."""
+        pending, self.pending = self.pending, {}
+        return pending
+
+    def write(self, pending):
+        """Blocking file I/O: call through asyncio.to_thread with take_pending()'s result."""
+        if time.time() - self.last_prune >= 3600:
+            self.prune()
+
+        if not pending:
+            return
+        self.folder.mkdir(exist_ok=True)
+        for path, lines in pending.items():
+            with open(path, "a", encoding="utf-8") as f:
+                f.writelines(lines)
+
+    def window(self, key, seconds):
+        """Ticks from the last `seconds` as (times, prices) numpy arrays."""
+        rows = self.ticks.get(key)
+        if not rows:
+            return np.empty(0), np.empty(0)
+        data = np.array(rows, dtype=float)
+        start = np.searchsorted(data[:, 0], time.time() - seconds)
+        return data[start:, 0], data[start:, 1]